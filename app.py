@@ -4,21 +4,30 @@
 
 ########## CONFIGURATION-BLOCK ##########
 MAX_DAYS = 30
-STEP_MINUTES = 1  # Default value; will be overridden by user selection
+STEP_MINUTES = None  # Default selection; None picks the step from latitude
+COARSE_STEP_MINUTES = 15  # First-pass sampling stride before refining crossings
+SUN_APPROX_MARGIN = 0.1  # Degrees; the low-precision Sun is good to ~0.015
+MOON_APPROX_MARGIN = 1.0  # Degrees; the low-precision Moon is good to ~0.4
+LOOKUP_MISS_TTL = 300  # Seconds a failed LocationIQ lookup is not re-sent
+FAST_MODE_MAX_LAT = 60  # Degrees; beyond this Fast mode shows an accuracy warning
 USE_CITY_SEARCH = True
 DEBUG = True
 ######## END CONFIG BLOCK ###############
 
 import streamlit as st
-from datetime import date, datetime, timedelta
-import pytz
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 from timezonefinder import TimezoneFinder
 import pandas as pd
+import numpy as np
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import folium
 from streamlit_folium import st_folium
-from skyfield.api import load, Topos
-from time import sleep
+from skyfield.api import load, wgs84
+from time import monotonic
+import threading
 
 ########################################
 # PAGE CONFIG + Custom CSS
@@ -67,49 +76,155 @@ st.markdown("""
 ########################################
 def debug_print(msg: str):
     if DEBUG:
-        # Append the message to the progress console
-        st.session_state["progress_console"] += msg + "\n"
-
-def moon_phase_icon(phase_deg):
-    """Return an emoji for the moon phase."""
-    x = phase_deg % 360
-    if x < 22.5 or x >= 337.5:
-        return "🌑"
-    elif x < 67.5:
-        return "🌒"
-    elif x < 112.5:
-        return "🌓"
-    elif x < 157.5:
-        return "🌔"
-    elif x < 202.5:
-        return "🌕"
-    elif x < 247.5:
-        return "🌖"
-    elif x < 292.5:
-        return "🌗"
+        # Append the message to the progress console (joined at display time)
+        st.session_state["progress_log"].append(msg)
+
+def format_hours_minutes(minutes):
+    """Format a Series of minute counts as "H Hours M Minutes"."""
+    return (minutes // 60).astype(str) + " Hours " + (minutes % 60).astype(str) + " Minutes"
+
+def auto_step_minutes(lat):
+    """
+    Sampling step for the "Auto" accuracy setting. Twilight is short at low
+    latitudes, so 5 minutes is plenty; towards the poles the Sun grazes
+    -18° and a finer step keeps those crossings exact.
+    """
+    if abs(lat) < 50:
+        return 5
+    elif abs(lat) < 66:
+        return 2
     else:
-        return "🌘"
+        return 1
+
+MOON_PHASE_EMOJIS = ("🌑", "🌒", "🌓", "🌔", "🌕", "🌖", "🌗", "🌘")
+
+def moon_phase_icons(phase_degs):
+    """Return moon-phase emojis for an array of phase angles, one per 45° bucket centred on new moon."""
+    buckets = ((np.asarray(phase_degs) + 22.5) % 360 // 45).astype(int)
+    return np.array(MOON_PHASE_EMOJIS)[buckets]
+
+########################################
+# Cached resources
+########################################
+@st.cache_resource
+def get_ephemeris():
+    """Load the timescale and DE421 ephemeris once per Streamlit process."""
+    ts = load.timescale()
+    eph = load('de421.bsp')
+    return ts, eph
+
+@st.cache_resource
+def get_tzfinder():
+    """Build the TimezoneFinder polygon index once per Streamlit process."""
+    return TimezoneFinder()
+
+@st.cache_resource(max_entries=32)
+def get_observer(lat, lon):
+    """
+    Skyfield Earth + wgs84 observer at (lat, lon). Callers round the
+    coordinates so repeated calculations at a site reuse the same object.
+    """
+    _, eph = get_ephemeris()
+    return eph['Earth'] + wgs84.latlon(lat, lon)
+
+@st.cache_data(max_entries=1024, show_spinner=False)
+def lookup_timezone(lat, lon):
+    """IANA zone name at (lat, lon), or None if there is none."""
+    return get_tzfinder().timezone_at(lng=lon, lat=lat)
+
+def resolve_timezone(lat, lon):
+    """Valid IANA zone name at (lat, lon), falling back to "UTC"."""
+    # Round to ~1 km so nearby locations share a cached lookup
+    tz_name = lookup_timezone(round(lat, 2), round(lon, 2))
+    if not tz_name:
+        return "UTC"
+    try:
+        ZoneInfo(tz_name)
+    except ZoneInfoNotFoundError:
+        st.warning(f"Unknown timezone for coordinates ({lat}, {lon}). Defaulting to UTC.")
+        return "UTC"
+    return tz_name
+
+@st.cache_resource
+def get_http_session():
+    """Shared requests.Session so LocationIQ calls reuse TCP/TLS connections."""
+    session = requests.Session()
+    session.headers.update({"Accept": "application/json"})
+    # Retry failed connects only: a retried read would multiply the read
+    # timeout, and HTTP error statuses are left to the negative cache
+    retries = Retry(total=2, connect=2, read=0, status=0, backoff_factor=0.3,
+                    respect_retry_after_header=False)
+    session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=4, max_retries=retries))
+    return session
+
+@st.cache_resource
+def get_lookup_misses():
+    """
+    (lock, misses): misses maps a LocationIQ URL to the time.monotonic() of its
+    last failed lookup. It is shared by every session, so hold the lock while
+    reading or changing it.
+    """
+    return threading.Lock(), {}
+
+def build_map(lat, lon, zoom):
+    """
+    Folium map with a marker at (lat, lon). Built fresh on every rerun:
+    st_folium renders the Map it is given, and rendering a shared instance
+    twice duplicates its header and tile layer.
+    """
+    folium_map = folium.Map(location=[lat, lon], zoom_start=zoom)
+    folium.Marker([lat, lon], popup="Location").add_to(folium_map)
+    return folium_map
 
 ########################################
 # LocationIQ city + reverse
 ########################################
+@st.cache_data(ttl=86400, max_entries=1024, show_spinner=False)
+def locationiq_get(url):
+    """
+    GET a LocationIQ URL and return the decoded JSON.
+    Non-200 responses raise, so failed lookups are retried instead of cached.
+    """
+    resp = get_http_session().get(url, timeout=(3, 10))
+    if resp.status_code != 200:
+        raise requests.HTTPError(f"code {resp.status_code}, text={resp.text}")
+    return resp.json()
+
+def locationiq_lookup(url):
+    """
+    locationiq_get, except that a URL which failed within LOOKUP_MISS_TTL
+    fails again without a request, so a mistyped city isn't re-sent on
+    every rerun.
+    """
+    lock, misses = get_lookup_misses()
+    now = monotonic()
+    with lock:
+        failed_at = misses.get(url)
+    if failed_at is not None and now - failed_at < LOOKUP_MISS_TTL:
+        raise requests.HTTPError("lookup failed recently; not retrying yet")
+    try:
+        return locationiq_get(url)
+    except requests.HTTPError:
+        with lock:
+            # Forget expired misses so the dict stays small
+            for old_url in [u for u, t in misses.items() if now - t >= LOOKUP_MISS_TTL]:
+                del misses[old_url]
+            misses[url] = now
+        raise
+
 def geocode_city(city_name, token):
     """City -> (lat, lon) using LocationIQ /v1/search."""
     if not USE_CITY_SEARCH or not city_name.strip():
         return None
     url = f"https://us1.locationiq.com/v1/search?key={token}&q={city_name}&format=json"
     try:
-        resp = requests.get(url, timeout=10)
-        if resp.status_code == 200:
-            data = resp.json()
-            if isinstance(data, list) and data:
-                lat = float(data[0]["lat"])
-                lon = float(data[0]["lon"])
-                return (lat, lon)
-            else:
-                debug_print(f"No results for city: {city_name}")
+        data = locationiq_lookup(url)
+        if isinstance(data, list) and data:
+            lat = float(data[0]["lat"])
+            lon = float(data[0]["lon"])
+            return (lat, lon)
         else:
-            debug_print(f"City lookup code {resp.status_code}, text={resp.text}")
+            debug_print(f"No results for city: {city_name}")
     except Exception as e:
         debug_print(f"City lookup error: {e}")
     return None
@@ -118,204 +233,387 @@ def reverse_geocode(lat, lon, token):
     """(lat, lon) -> city using LocationIQ /v1/reverse."""
     if not USE_CITY_SEARCH:
         return None
-    url = f"https://us1.locationiq.com/v1/reverse?key={token}&lat={lat}&lon={lon}&format=json"
+    # Round to ~100 m so nearby map clicks share a cached lookup
+    url = f"https://us1.locationiq.com/v1/reverse?key={token}&lat={round(lat, 3)}&lon={round(lon, 3)}&format=json"
     try:
-        resp = requests.get(url, timeout=10)
-        if resp.status_code == 200:
-            data = resp.json()
-            address = data.get("address", {})
-            city = address.get("city") or address.get("town") or address.get("village")
-            return city if city else data.get("display_name")
-        else:
-            debug_print(f"Reverse code {resp.status_code}, text={resp.text}")
+        data = locationiq_lookup(url)
+        address = data.get("address", {})
+        city = address.get("city") or address.get("town") or address.get("village")
+        return city if city else data.get("display_name")
     except Exception as e:
         debug_print(f"Reverse error: {e}")
     return None
 
+########################################
+# Low-precision Sun & Moon
+########################################
+def approx_observer_frame(t, lat, lon):
+    """
+    (T, local sidereal angle, sin lat, cos lat) for times t at lat/lon, where T
+    is Julian centuries (TT) since J2000. Computed once and shared by the
+    low-precision Sun and Moon.
+    """
+    T = (t.tt - 2451545.0) / 36525.0
+    gmst = np.radians(280.46061837 + 360.98564736629 * (t.ut1 - 2451545.0))
+    phi = np.radians(lat)
+    return T, gmst + np.radians(lon), np.sin(phi), np.cos(phi)
+
+def approx_altitude_deg(frame, ra, dec):
+    """Altitude (degrees) of geocentric RA/Dec (radians) in an approx_observer_frame."""
+    _, lst, sin_phi, cos_phi = frame
+    sin_alt = sin_phi * np.sin(dec) + cos_phi * np.cos(dec) * np.cos(lst - ra)
+    return np.degrees(np.arcsin(sin_alt))
+
+def approx_sun_lon(T):
+    """
+    Geometric ecliptic longitude of the Sun (radians) at T Julian centuries,
+    from the low-precision solar coordinates in Meeus, Astronomical
+    Algorithms ch. 25.
+    """
+    L0 = 280.46646 + 36000.76983 * T
+    M = np.radians(357.52911 + 35999.05029 * T)
+    C = ((1.914602 - 0.004817 * T) * np.sin(M)
+         + (0.019993 - 0.000101 * T) * np.sin(2 * M)
+         + 0.000289 * np.sin(3 * M))
+    return np.radians(L0 + C)
+
+def approx_moon_ecliptic(T):
+    """
+    Geocentric (longitude, latitude, horizontal parallax) of the Moon, all in
+    radians, at T Julian centuries, from the main terms of Meeus ch. 47.
+    """
+    Lp = 218.3164477 + 481267.88123421 * T
+    D = np.radians(297.8501921 + 445267.1114034 * T)
+    M = np.radians(357.5291092 + 35999.0502909 * T)
+    Mp = np.radians(134.9633964 + 477198.8675055 * T)
+    F = np.radians(93.2720950 + 483202.0175233 * T)
+    moon_lon = np.radians(Lp + 6.289 * np.sin(Mp) + 1.274 * np.sin(2*D - Mp)
+                          + 0.658 * np.sin(2*D) + 0.214 * np.sin(2*Mp)
+                          - 0.186 * np.sin(M) - 0.114 * np.sin(2*F))
+    moon_lat = np.radians(5.128 * np.sin(F) + 0.281 * np.sin(Mp + F)
+                          + 0.278 * np.sin(Mp - F) + 0.173 * np.sin(2*D - F))
+    parallax = np.radians(0.9508 + 0.0518 * np.cos(Mp) + 0.0095 * np.cos(2*D - Mp)
+                          + 0.0078 * np.cos(2*D) + 0.0028 * np.cos(2*Mp))
+    return moon_lon, moon_lat, parallax
+
+def approx_sun_alt_deg(frame):
+    """
+    Geometric Sun altitude (degrees) in an approx_observer_frame. Good to
+    ~0.015 degrees; only used to screen coarse samples before Skyfield
+    refines the intervals near the threshold.
+    """
+    T = frame[0]
+    sun_lon = approx_sun_lon(T)
+    eps = np.radians(23.439291 - 0.0130042 * T)
+    ra = np.arctan2(np.cos(eps) * np.sin(sun_lon), np.cos(sun_lon))
+    dec = np.arcsin(np.sin(eps) * np.sin(sun_lon))
+    return approx_altitude_deg(frame, ra, dec)
+
+def approx_moon_alt_deg(frame):
+    """
+    Topocentric Moon altitude (degrees) in an approx_observer_frame, with a
+    first-order parallax correction. Good to ~0.4 degrees; only used to
+    screen coarse samples before Skyfield refines the intervals near the
+    horizon.
+    """
+    T = frame[0]
+    moon_lon, moon_lat, parallax = approx_moon_ecliptic(T)
+    eps = np.radians(23.439291 - 0.0130042 * T)
+    ra = np.arctan2(np.sin(moon_lon) * np.cos(eps) - np.tan(moon_lat) * np.sin(eps), np.cos(moon_lon))
+    dec = np.arcsin(np.sin(moon_lat) * np.cos(eps) + np.cos(moon_lat) * np.sin(eps) * np.sin(moon_lon))
+
+    alt = np.radians(approx_altitude_deg(frame, ra, dec))
+    return np.degrees(alt - parallax * np.cos(alt))
+
+########################################
+# Adaptive Altitude Sampling
+########################################
+def sample_altitudes(alt_fn, times, n, coarse_idx, coarse_alts, threshold, margin=0.0):
+    """
+    Return a (days, n) altitude array for `times`, a flat Time holding n
+    samples per day. `coarse_alts` holds each day's altitudes at its
+    `coarse_idx` samples, possibly from a low-precision model that is good to
+    within `margin` degrees. alt_fn is evaluated once more over all coarse
+    intervals that straddle `threshold` or come within `margin` of it.
+    Elsewhere the altitude is interpolated from the coarse samples; it is
+    smooth and well clear of the threshold there, so no crossing is lost.
+    """
+    # Linear interpolation between coarse samples, for all days at once
+    grid = np.arange(n)
+    seg = np.clip(np.searchsorted(coarse_idx, grid, side="right") - 1, 0, len(coarse_idx) - 2)
+    w = (grid - coarse_idx[seg]) / (coarse_idx[seg+1] - coarse_idx[seg])
+    alts = coarse_alts[:, seg] * (1 - w) + coarse_alts[:, seg+1] * w
+
+    below = coarse_alts < threshold
+    near = np.abs(coarse_alts - threshold) < margin
+    refine = (below[:, :-1] != below[:, 1:]) | near[:, :-1] | near[:, 1:]
+    days_k, ks = np.nonzero(refine)
+    if ks.size:
+        idx = np.unique(np.concatenate([
+            np.arange(d*n + coarse_idx[k], d*n + coarse_idx[k+1] + 1)
+            for d, k in zip(days_k, ks)
+        ]))
+        alts[idx // n, idx % n] = alt_fn(times[idx])
+    return alts
+
 ########################################
 # Find Dark Crossings
 ########################################
-def find_dark_crossings(sun_alts, times_list, local_tz):
-    """
-    Return (dark_start_str, dark_end_str) by scanning from >=-18 -> < -18 for start,
-    then < -18 -> >= -18 for end. If dark_end is not found on the same day, it assumes
-    dark_end occurs on the next day and returns the time accordingly.
-    """
-    N = len(sun_alts)
-    start_str = "-"
-    end_str = "-"
-    found_start = False
-
-    for i in range(N-1):
-        # Crossing from alt >= -18 -> < -18 => dark start
-        if sun_alts[i] >= -18 and sun_alts[i+1] < -18 and not found_start:
-            dt_loc = times_list[i+1].utc_datetime().astimezone(local_tz)
-            start_str = dt_loc.strftime("%H:%M")
-            found_start = True
-        # Crossing from alt < -18 -> >= -18 => dark end
-        elif sun_alts[i] < -18 and sun_alts[i+1] >= -18 and found_start and end_str == "-":
-            dt_loc = times_list[i+1].utc_datetime().astimezone(local_tz)
-            end_str = dt_loc.strftime("%H:%M")
-            break
-
-    # If dark end wasn't found on the same day, attempt to find it on the next day
-    if found_start and end_str == "-":
-        for i in range(N-1):
-            if sun_alts[i] < -18 and sun_alts[i+1] >= -18:
-                dt_loc = times_list[i+1].utc_datetime().astimezone(local_tz)
-                end_str = dt_loc.strftime("%H:%M")
-                break
-
-    return (start_str, end_str)
+def find_crossings(below):
+    """
+    Return (down, up) index arrays from a below-threshold mask: i is in down when
+    sample i is at/above the threshold and i+1 is below, and in up for the reverse.
+    """
+    down = np.flatnonzero(~below[:-1] & below[1:])
+    up = np.flatnonzero(below[:-1] & ~below[1:])
+    return down, up
+
+def crossing_time(times_list, alts, i, threshold):
+    """
+    Linearly interpolate the time at which alts crosses threshold between
+    samples i and i+1, instead of snapping to the next grid point.
+    """
+    frac = (threshold - alts[i]) / (alts[i+1] - alts[i])
+    whole = times_list.whole[i]
+    fraction = times_list.tt_fraction[i] + frac * (times_list.tt_fraction[i+1] - times_list.tt_fraction[i])
+    return times_list.ts.tt_jd(whole, fraction)
+
+def local_hhmm(t, local_tz):
+    """
+    Format an array of Skyfield times as local HH:MM strings, rounded to the
+    nearest minute. Skyfield converts the whole array to UTC in one call.
+    """
+    half_minute = timedelta(seconds=30)
+    return [(dt + half_minute).astimezone(local_tz).strftime("%H:%M") for dt in t.utc_datetime()]
+
+def events_hhmm(times, alts, idx, threshold, local_tz):
+    """
+    Local HH:MM of the crossing after each sample in idx, or "-" where idx
+    is -1. All events are interpolated and formatted in one pass.
+    """
+    idx = np.asarray(idx)
+    found = idx >= 0
+    out = np.full(len(idx), "-", dtype=object)
+    if found.any():
+        out[found] = local_hhmm(crossing_time(times, alts, idx[found], threshold), local_tz)
+    return out
+
+def below_spans(alts, below, threshold):
+    """
+    Return (lo, hi) arrays giving the part of each step, as fractions of the
+    step, during which the linearly interpolated altitude is below threshold.
+    below is the precomputed mask alts < threshold.
+    """
+    a0, a1 = alts[:-1], alts[1:]
+    below0, below1 = below[:-1], below[1:]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = np.clip((a0 - threshold) / (a0 - a1), 0.0, 1.0)
+    lo = np.where(~below0 & below1, x, 0.0)
+    hi = np.where(below1, 1.0, np.where(below0, x, 0.0))
+    return lo, hi
+
+def scan_day(sun_alts, moon_alts, step_minutes):
+    """
+    Reduce one day's altitude arrays to (astro_minutes, moonless_minutes,
+    dark_start_i, dark_end_i, moon_rise_i, moon_set_i). The minutes integrate
+    the interpolated time below each threshold, so crossings inside a step
+    count to the minute; the indices are the sample just before each
+    crossing, or None.
+    """
+    sun_below = sun_alts < -18.0
+    moon_below = moon_alts < 0.0
+
+    # Dark and moonless time per step, from the interpolated crossing points
+    sun_lo, sun_hi = below_spans(sun_alts, sun_below, -18.0)
+    moon_lo, moon_hi = below_spans(moon_alts, moon_below, 0.0)
+    dark = sun_hi - sun_lo
+    moonless = np.maximum(np.minimum(sun_hi, moon_hi) - np.maximum(sun_lo, moon_lo), 0.0)
+    astro_minutes = int(round(dark.sum() * step_minutes))
+    moonless_minutes = int(round(moonless.sum() * step_minutes))
+
+    # Dark start is the first >= -18 -> < -18 crossing. Dark end is the first
+    # crossing back after it; otherwise the morning end earlier in the day.
+    dark_starts, dark_ends = find_crossings(sun_below)
+    dark_start_i = dark_end_i = None
+    if dark_starts.size:
+        dark_start_i = dark_starts[0]
+        later_ends = dark_ends[dark_ends > dark_start_i]
+        if later_ends.size:
+            dark_end_i = later_ends[0]
+        elif dark_ends.size:
+            dark_end_i = dark_ends[0]
+
+    moon_sets, moon_rises = find_crossings(moon_below)
+    moon_rise_i = moon_rises[0] if moon_rises.size else None
+    moon_set_i = moon_sets[0] if moon_sets.size else None
+
+    return astro_minutes, moonless_minutes, dark_start_i, dark_end_i, moon_rise_i, moon_set_i
 
 ########################################
 # Astro Calculation
 ########################################
-def compute_day_details(lat, lon, start_date, end_date, moon_affect, step_minutes, progress_bar, token):
+@st.cache_data(ttl=3600, max_entries=64, show_spinner=False)
+def compute_days(lat, lon, tz_name, days, moon_affect, step_minutes, fast_mode=False):
     """
-    Performs the astronomical darkness calculations and updates the progress console and progress bar.
-    Returns the day-by-day results.
+    Performs the astronomical darkness calculations for a tuple of local days.
+    All days share one Skyfield time vector, so each body needs only a coarse
+    and a refinement altaz call for the whole range. In fast mode every sample
+    uses the closed-form models and Skyfield is skipped. Returns (columns, logs),
+    a dict of per-day result columns and logs[i] holding day i's progress
+    console lines, so the caller can replay them even when the result comes
+    from the cache.
     """
-    ts = load.timescale()
-    eph = load('de421.bsp')
-    debug_print("Loaded timescale & ephemeris")
+    ts, eph = get_ephemeris()
+    local_tz = ZoneInfo(tz_name)
 
-    tf = TimezoneFinder()
-    tz_name = tf.timezone_at(lng=lon, lat=lat)
-    if not tz_name:
-        tz_name = "UTC"
-    try:
-        local_tz = pytz.timezone(tz_name)
-    except pytz.UnknownTimeZoneError:
-        local_tz = pytz.utc
-        debug_print(f"Unknown timezone for coordinates ({lat}, {lon}). Defaulting to UTC.")
-    debug_print(f"Local Timezone: {tz_name}")
+    observer = get_observer(lat, lon)
 
-    topos = Topos(latitude_degrees=lat, longitude_degrees=lon)
-    observer = eph['Earth'] + topos
+    # Vector difference instead of observe(): skips the light-time loop,
+    # which only shifts Sun/Moon altitude by arcseconds.
+    sun_vec = eph['Sun'] - observer
+    moon_vec = eph['Moon'] - observer
 
     def sun_alt_deg(t):
-        app_sun = observer.at(t).observe(eph['Sun']).apparent()
-        alt, _, _ = app_sun.altaz()
+        alt, _, _ = sun_vec.at(t).altaz()
         return alt.degrees
 
     def moon_alt_deg(t):
-        app_moon = observer.at(t).observe(eph['Moon']).apparent()
-        alt_m, _, _ = app_moon.altaz()
+        alt_m, _, _ = moon_vec.at(t).altaz()
         return alt_m.degrees
 
-    day_results = []
-    day_count = 0
-    current = start_date
+    # Local midnight of each day, as the start of its 24h window
+    start_utcs = [
+        datetime(day.year, day.month, day.day, tzinfo=local_tz).astimezone(timezone.utc)
+        for day in days
+    ]
+
+    # Build every day's time grid directly in Julian Date space, as one flat vector
+    step_count = (24*60)//step_minutes
+    n = step_count + 1
+    t0 = ts.from_datetimes(start_utcs)
+    offsets = np.arange(n) * (step_minutes / 1440.0)
+    all_times = ts.tt_jd(
+        np.repeat(t0.whole, n),
+        (t0.tt_fraction[:, None] + offsets).ravel()
+    )
 
-    total_days = (end_date - start_date).days + 1
-    for _ in range(total_days):
-        if day_count >= MAX_DAYS:
-            debug_print(f"Reached maximum day limit of {MAX_DAYS}.")
-            break
-
-        debug_print(f"Processing day {day_count + 1}: {current}")
-
-        # Update progress bar
-        progress = (day_count + 1) / MAX_DAYS
-        progress_bar.progress(min(progress, 1.0))
-
-        # Local midnight -> next local midnight
-        local_mid = datetime(current.year, current.month, current.day, 0, 0, 0)
-        local_next = local_mid + timedelta(days=1)
-        try:
-            start_aware = local_tz.localize(local_mid, is_dst=None)
-            end_aware = local_tz.localize(local_next, is_dst=None)
-        except Exception as e:
-            debug_print(f"Timezone localization error: {e}")
-            start_aware = pytz.utc.localize(local_mid)
-            end_aware = pytz.utc.localize(local_next)
-        start_utc = start_aware.astimezone(pytz.utc)
-        end_utc = end_aware.astimezone(pytz.utc)
-
-        step_count = (24*60)//step_minutes
-        times_list = []
-        for i in range(step_count+1):
-            dt_utc = start_utc + timedelta(minutes=i*step_minutes)
-            times_list.append(ts.from_datetime(dt_utc))
-
-        sun_alts = []
-        moon_alts = []
-        for t_ in times_list:
-            s_alt = sun_alt_deg(t_)
-            m_alt = moon_alt_deg(t_)
-            sun_alts.append(s_alt)
-            moon_alts.append(m_alt)
-
-        # Summation
-        astro_minutes = 0
-        moonless_minutes = 0
-        for i in range(len(times_list)-1):
-            s_mid = (sun_alts[i] + sun_alts[i+1])/2
-            m_mid = (moon_alts[i] + moon_alts[i+1])/2
-            if s_mid < -18.0:  # astro dark
-                astro_minutes += step_minutes
-                if moon_affect == "Ignore Moonlight":
-                    moonless_minutes += step_minutes
-                else:
-                    if m_mid < 0.0:
-                        moonless_minutes += step_minutes
+    if fast_mode:
+        frame = approx_observer_frame(all_times, lat, lon)
+        all_sun_alts = approx_sun_alt_deg(frame).reshape(len(days), n)
+        all_moon_alts = approx_moon_alt_deg(frame).reshape(len(days), n)
+    else:
+        # Coarse pass every COARSE_STEP_MINUTES, full resolution only where
+        # the Sun or Moon crosses its threshold
+        stride = max(1, COARSE_STEP_MINUTES // step_minutes)
+        coarse_idx = np.arange(0, n, stride)
+        if coarse_idx[-1] != step_count:
+            coarse_idx = np.append(coarse_idx, step_count)
+
+        # The coarse pass uses the closed-form models; Skyfield only refines
+        # the intervals near -18 degrees (Sun) and the horizon (Moon)
+        coarse_times = all_times[(np.arange(len(days))[:, None] * n + coarse_idx).ravel()]
+        frame = approx_observer_frame(coarse_times, lat, lon)
+        coarse_sun = approx_sun_alt_deg(frame).reshape(len(days), -1)
+        coarse_moon = approx_moon_alt_deg(frame).reshape(len(days), -1)
+        all_sun_alts = sample_altitudes(sun_alt_deg, all_times, n, coarse_idx, coarse_sun, -18.0, SUN_APPROX_MARGIN)
+        all_moon_alts = sample_altitudes(moon_alt_deg, all_times, n, coarse_idx, coarse_moon, 0.0, MOON_APPROX_MARGIN)
+
+    # Results are filled column by column, one slot per day
+    day_count = len(days)
+    columns = {
+        "date": [None] * day_count,
+        # Minute totals (at most 1440 a day); main() formats them for display
+        "astro_min": np.zeros(day_count, dtype=np.int16),
+        "moonless_min": np.zeros(day_count, dtype=np.int16)
+    }
+    event_idx = {name: np.full(day_count, -1) for name in ("dark_start", "dark_end", "moon_rise", "moon_set")}
+    logs = []
+    for i, day in enumerate(days):
+        sun_alts = all_sun_alts[i]
+        moon_alts = all_moon_alts[i]
+
+        (astro_minutes, moonless_minutes,
+         dark_start_i, dark_end_i, moon_rise_i, moon_set_i) = scan_day(sun_alts, moon_alts, step_minutes)
+        if moon_affect == "Ignore Moonlight":
+            moonless_minutes = astro_minutes
 
         astro_hrs = astro_minutes//60
         astro_mins = astro_minutes % 60
         moonless_hrs = moonless_minutes//60
         moonless_mins = moonless_minutes % 60
-        debug_print(f"astro_hrs={astro_hrs}, astro_mins={astro_mins}, moonless_hrs={moonless_hrs}, moonless_mins={moonless_mins}")
-
-        # Crossing-based times
-        dark_start_str, dark_end_str = find_dark_crossings(sun_alts, times_list, local_tz)
-
-        # Moon rise/set
-        m_rise_str = "-"
-        m_set_str = "-"
-        prev_alt = moon_alts[0]
-        for i in range(1, len(moon_alts)):
-            if prev_alt < 0 and moon_alts[i] >= 0 and m_rise_str == "-":
-                dt_loc = times_list[i].utc_datetime().astimezone(local_tz)
-                m_rise_str = dt_loc.strftime("%H:%M")
-            if prev_alt >= 0 and moon_alts[i] < 0 and m_set_str == "-":
-                dt_loc = times_list[i].utc_datetime().astimezone(local_tz)
-                m_set_str = dt_loc.strftime("%H:%M")
-            prev_alt = moon_alts[i]
-
-        # Moon phase at local noon
-        local_noon = datetime(current.year, current.month, current.day, 12, 0, 0)
-        try:
-            local_noon_aware = local_tz.localize(local_noon, is_dst=None)
-        except Exception as e:
-            debug_print(f"Timezone localization error for noon: {e}")
-            local_noon_aware = pytz.utc.localize(local_noon)
-        noon_utc = local_noon_aware.astimezone(pytz.utc)
-        t_noon = ts.from_datetime(noon_utc)
-        obs_noon = observer.at(t_noon)
-        sun_ecl = obs_noon.observe(eph['Sun']).apparent().ecliptic_latlon()
-        moon_ecl = obs_noon.observe(eph['Moon']).apparent().ecliptic_latlon()
-        phase_angle = (moon_ecl[1].degrees - sun_ecl[1].degrees) % 360
-
-        day_results.append({
-            "date": current.strftime("%Y-%m-%d"),
-            "astro_dark_hours": f"{int(astro_hrs)} Hours {int(astro_mins)} Minutes",
-            "moonless_hours": f"{int(moonless_hrs)} Hours {int(moonless_mins)} Minutes",
-            "dark_start": dark_start_str if dark_start_str else "-",
-            "dark_end": dark_end_str if dark_end_str else "-",
-            "moon_rise": m_rise_str,
-            "moon_set": m_set_str,
-            "moon_phase": moon_phase_icon(phase_angle)
-        })
-
-        current += timedelta(days=1)
-        day_count += 1
-
-        # Simulate processing time (remove or adjust in production)
-        sleep(0.1)
-
-    # Final update to progress bar
+        logs.append([f"astro_hrs={astro_hrs}, astro_mins={astro_mins}, moonless_hrs={moonless_hrs}, moonless_mins={moonless_mins}"])
+
+        # Crossing sample indices into the flat arrays, -1 if none
+        base = i * n
+        for name, idx in (("dark_start", dark_start_i), ("dark_end", dark_end_i),
+                          ("moon_rise", moon_rise_i), ("moon_set", moon_set_i)):
+            event_idx[name][i] = base + idx if idx is not None else -1
+
+        columns["date"][i] = day.strftime("%Y-%m-%d")
+        columns["astro_min"][i] = astro_minutes
+        columns["moonless_min"][i] = moonless_minutes
+
+    # Crossing-based times, interpolated and converted for all days at once
+    flat_sun, flat_moon = all_sun_alts.ravel(), all_moon_alts.ravel()
+    columns["dark_start"] = events_hhmm(all_times, flat_sun, event_idx["dark_start"], -18.0, local_tz).tolist()
+    columns["dark_end"] = events_hhmm(all_times, flat_sun, event_idx["dark_end"], -18.0, local_tz).tolist()
+    columns["moon_rise"] = events_hhmm(all_times, flat_moon, event_idx["moon_rise"], 0.0, local_tz).tolist()
+    columns["moon_set"] = events_hhmm(all_times, flat_moon, event_idx["moon_set"], 0.0, local_tz).tolist()
+
+    return columns, logs
+
+def compute_moon_phases(tz_name, days):
+    """
+    Return the Moon-Sun ecliptic longitude difference (degrees) at local noon
+    for every day. The closed-form longitudes are accurate to a fraction of a
+    degree, far finer than the 45 degree phase icons need.
+    """
+    ts, _ = get_ephemeris()
+    local_tz = ZoneInfo(tz_name)
+
+    noon_utcs = [
+        datetime(day.year, day.month, day.day, 12, tzinfo=local_tz).astimezone(timezone.utc)
+        for day in days
+    ]
+    t_noon = ts.from_datetimes(noon_utcs)
+
+    T = (t_noon.tt - 2451545.0) / 36525.0
+    return np.degrees(approx_moon_ecliptic(T)[0] - approx_sun_lon(T)) % 360
+
+def compute_day_details(lat, lon, tz_name, start_date, end_date, moon_affect, step_minutes, progress_bar, fast_mode=False):
+    """
+    Performs the astronomical darkness calculations, then fills the progress bar
+    and replays each day's progress console lines.
+    Returns the day-by-day results as a DataFrame, one row per day.
+    """
+    get_ephemeris()
+    debug_print("Loaded timescale & ephemeris")
+
+    debug_print(f"Local Timezone: {tz_name}")
+
+    total_days = (end_date - start_date).days + 1
+    days = [start_date + timedelta(days=i) for i in range(min(total_days, MAX_DAYS))]
+
+    # Round to ~100 m so small map nudges reuse the cached observer and calculation
+    lat, lon = round(lat, 3), round(lon, 3)
+    phase_angles = compute_moon_phases(tz_name, days)
+    columns, logs = compute_days(lat, lon, tz_name, tuple(days), moon_affect, step_minutes, fast_mode)
+
+    # compute_days does the whole range in one call, so there is no per-day
+    # progress to report; the bar goes straight to done
     progress_bar.progress(1.0)
+
+    for day_count, (day, day_log) in enumerate(zip(days, logs)):
+        debug_print(f"Day {day_count + 1}: {day}")
+        for msg in day_log:
+            debug_print(msg)
+
+    day_results = pd.DataFrame(columns)
+    day_results["moon_phase"] = pd.Categorical(moon_phase_icons(phase_angles), categories=MOON_PHASE_EMOJIS)
+
+    if total_days > MAX_DAYS:
+        debug_print(f"Reached maximum day limit of {MAX_DAYS}.")
+
     debug_print("All calculations completed.")
 
     return day_results
@@ -334,8 +632,10 @@ def main():
         st.session_state["lat"] = 31.6258
     if "lon" not in st.session_state:
         st.session_state["lon"] = -7.9892
-    if "progress_console" not in st.session_state:
-        st.session_state["progress_console"] = ""
+    if "tz_name" not in st.session_state:
+        st.session_state["tz_name"] = resolve_timezone(st.session_state["lat"], st.session_state["lon"])
+    if "progress_log" not in st.session_state:
+        st.session_state["progress_log"] = []
     if "selected_dates" not in st.session_state:
         st.session_state["selected_dates"] = [date.today(), date.today() + timedelta(days=1)]
     if "last_click" not in st.session_state:
@@ -359,6 +659,7 @@ def main():
                 coords = geocode_city(cval, LOCATIONIQ_TOKEN)
                 if coords:
                     st.session_state["lat"], st.session_state["lon"] = coords
+                    st.session_state["tz_name"] = resolve_timezone(*coords)
                     st.session_state["city"] = cval
                 else:
                     st.warning("City not found or blocked. Check spelling or usage limits.")
@@ -378,6 +679,7 @@ def main():
     with input_cols[2]:
         # Allowed Deviation Minutes Selector
         step_options = {
+            "Auto": None,
             "1 Minute": 1,
             "2 Minutes": 2,
             "5 Minutes": 5,
@@ -387,14 +689,15 @@ def main():
         step_minutes = st.selectbox(
             "Time Accuracy (Mins)",
             options=list(step_options.keys()),
-            index=0,
+            index=list(step_options.values()).index(STEP_MINUTES),
             help="""This setting determines how precise the astronomical darkness calculations are, measured in minutes.
-- **Higher values** (like 5 or 15 minutes) make calculations faster but less precise, saving computational resources.
+- **Higher values** (like 15 or 30 minutes) make calculations faster but less precise, saving computational resources.
 - **Lower values** (like 1 minute) make calculations more accurate but take longer, especially over extended date ranges. 
 
 **Choose the level of accuracy that suits your needs:**
-- **1 minute** for short periods (a few days) e.g. If moonrise is 17:28, it will show 17:28.
-- **5 minutes or more** for longer durations (multiple weeks) e.g. If moonrise is 17:28, it will show 17:30.
+- **Auto** (the default) uses 5 minutes below 50° latitude, 2 minutes up to 66° and 1 minute beyond.
+- **5 minutes** is plenty for most trips; dark start/end, moonrise/moonset and the darkness totals are interpolated between samples, so they stay accurate to the minute.
+- **1 minute** if you want every sample evaluated exactly, e.g. near the poles where the Sun barely dips below -18°.
 """
         )
         # Removed the ⓘ tooltip icon completely
@@ -413,6 +716,7 @@ def main():
         )
         if abs(lat_in - st.session_state["lat"]) > 1e-8:
             st.session_state["lat"] = lat_in
+            st.session_state["tz_name"] = resolve_timezone(lat_in, st.session_state["lon"])
 
     with coord_cols[1]:
         lon_in = st.number_input(
@@ -425,6 +729,7 @@ def main():
         )
         if abs(lon_in - st.session_state["lon"]) > 1e-8:
             st.session_state["lon"] = lon_in
+            st.session_state["tz_name"] = resolve_timezone(st.session_state["lat"], lon_in)
 
     with coord_cols[2]:
         # Moon Influence Dropdown
@@ -438,14 +743,28 @@ def main():
             index=0,
             help="Choose whether to include the moon's effect on astronomical darkness."
         )
+        fast_mode = st.checkbox(
+            "Fast mode",
+            value=False,
+            help="Use low-precision Sun and Moon formulas instead of the JPL ephemeris. About five times quicker. Below about 50° latitude event times and totals shift by a minute or two; at high latitudes, where the Sun and Moon skim the threshold, errors grow to ten minutes or more and moonrise/moonset can appear or disappear."
+        )
+        if fast_mode and abs(st.session_state["lat"]) > FAST_MODE_MAX_LAT:
+            st.warning(f"Fast mode is less accurate beyond {FAST_MODE_MAX_LAT}° latitude; turn it off for exact times.")
 
     # **Moved the Map Below Coordinates & Moon Influence and Above Calculate Button**
     st.markdown("#### Select Location on Map")
     st.markdown("<h5>You may need to click the map twice to make it register a new location. Free API fun :)</h5>", unsafe_allow_html=True)
     with st.expander("View Map"):
-        folium_map = folium.Map(location=[st.session_state["lat"], st.session_state["lon"]], zoom_start=10)
-        folium.Marker([st.session_state["lat"], st.session_state["lon"]], popup="Location").add_to(folium_map)
-        map_click = st_folium(folium_map, width=700, height=500)
+        folium_map = build_map(st.session_state["lat"], st.session_state["lon"], 10)
+        # A stable key keeps the component mounted across reruns, and only
+        # clicks (not pans/zooms) are sent back to trigger a rerun
+        map_click = st_folium(
+            folium_map,
+            key="location_map",
+            width=700,
+            height=500,
+            returned_objects=["last_clicked"]
+        )
 
         if map_click and 'last_clicked' in map_click and map_click['last_clicked']:
             clicked_lat = map_click['last_clicked']['lat']
@@ -459,6 +778,7 @@ def main():
                 current_click = (clicked_lat, clicked_lon)
                 if st.session_state["last_click"] != current_click:
                     st.session_state["lat"], st.session_state["lon"] = current_click
+                    st.session_state["tz_name"] = resolve_timezone(*current_click)
                     # Perform reverse geocoding to get city
                     city = reverse_geocode(clicked_lat, clicked_lon, LOCATIONIQ_TOKEN)
                     if city:
@@ -483,7 +803,7 @@ def main():
     console_placeholder = st.empty()
     console_placeholder.text_area(
         "Progress Console",
-        value=st.session_state["progress_console"],
+        value="\n".join(st.session_state["progress_log"]),
         height=150,
         max_chars=None,
         key="progress_console_display",  # Ensure this key is unique and used only once
@@ -523,47 +843,36 @@ def main():
         # Proceed only if date range is valid
         if (start_date <= end_date) and (delta_days <= MAX_DAYS):
             # Reset console
-            st.session_state["progress_console"] = ""
+            st.session_state["progress_log"] = []
 
             # Convert step_minutes selection to integer
-            step_min = step_options[step_minutes]
+            step_min = step_options[step_minutes] or auto_step_minutes(st.session_state["lat"])
 
             # Start Progress Bar
             progress_bar.progress(0)
             progress_text.text("Starting calculations...")
 
-            # Perform calculations with real-time updates
+            # Perform calculations; the bar fills once they are done
             daily_data = compute_day_details(
                 st.session_state["lat"],
                 st.session_state["lon"],
+                st.session_state["tz_name"],
                 start_date,
                 end_date,
                 moon_affect,
                 step_min,
                 progress_bar,
-                LOCATIONIQ_TOKEN
+                fast_mode
             )
 
-            # Final update to progress bar
-            progress_bar.progress(1.0)
             progress_text.text("Calculations completed.")
 
-            if not daily_data:
+            if daily_data.empty:
                 st.warning("No data?? Possibly 0-day range or an error.")
                 st.stop()
 
-            total_astro = 0
-            total_moonless = 0
-            for d in daily_data:
-                # Extract hours and minutes
-                astro_parts = d["astro_dark_hours"].split()
-                astro_hours = int(astro_parts[0])
-                astro_minutes = int(astro_parts[2])
-                moonless_parts = d["moonless_hours"].split()
-                moonless_hours = int(moonless_parts[0])
-                moonless_minutes = int(moonless_parts[2])
-                total_astro += astro_hours * 60 + astro_minutes
-                total_moonless += moonless_hours * 60 + moonless_minutes
+            total_astro = int(daily_data["astro_min"].sum())
+            total_moonless = int(daily_data["moonless_min"].sum())
 
             total_astro_hours = total_astro // 60
             total_astro_minutes = total_astro % 60
@@ -599,8 +908,7 @@ def main():
                     """, unsafe_allow_html=True)
 
             st.markdown("#### Day-by-Day Breakdown")
-            df = pd.DataFrame(daily_data)
-            df = df.rename(columns={
+            display_columns = {
                 "date": "Date",
                 "astro_dark_hours": "Astro (hrs)",
                 "moonless_hours": "Moonless (hrs)",
@@ -609,12 +917,15 @@ def main():
                 "moon_rise": "Moonrise",
                 "moon_set": "Moonset",
                 "moon_phase": "Phase"
-            })
-            # Remove row index by resetting index and dropping it
-            df.reset_index(drop=True, inplace=True)
-            # Convert to HTML without index
-            html_table = df.to_html(index=False)
-            st.markdown(html_table, unsafe_allow_html=True)
+            }
+            # Format the minute totals, then project onto the display columns
+            df = daily_data.assign(
+                astro_dark_hours=format_hours_minutes(daily_data["astro_min"]),
+                moonless_hours=format_hours_minutes(daily_data["moonless_min"])
+            )
+            df = df[list(display_columns)].rename(columns=display_columns)
+            # Native table without the row index
+            st.dataframe(df, hide_index=True)
 
 if __name__ == "__main__":
     main()